@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+
+# 실행: gunicorn -c gunicorn.conf.py (어느 디렉토리에서 실행해도 이 파일의 디렉토리 기준으로 앱을 불러옴)
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = "wordCloud_tree:app"
+bind = "0.0.0.0:5001"
+
+# 마스터에서 앱을 미리 로드해 마스크 배열, 정규식 등 읽기 전용 데이터를 워커 간 공유 (copy-on-write)
+preload_app = True
+workers = (os.cpu_count() or 1) * 2 + 1
+worker_class = "gthread"
+threads = 4
+
+# 여러 프로세스가 server.log에 함께 쓰므로 RotatingFileHandler 대신 WatchedFileHandler 사용
+# 로그 회전은 logrotate로 설정, 예: /etc/logrotate.d/wordcloud
+#   /path/to/main/server.log {
+#       size 1M
+#       rotate 5
+#       missingok
+#       notifempty
+#   }
+raw_env = ["LOG_HANDLER=watched"]
+
+# /api/news 응답 캐시는 기본적으로 워커마다 따로 유지됨 (SimpleCache)
+# 워커 간에 공유하려면 환경 변수 CACHE_TYPE=RedisCache, CACHE_REDIS_URL=redis://... 지정 (redis 패키지 필요)
+
+# 워드클라우드 업데이트 전담 프로세스
+_refresher = None
+
+def start_refresher():
+    global _refresher
+    import wordCloud_tree
+
+    context = multiprocessing.get_context("spawn")
+    _refresher = context.Process(target=wordCloud_tree.refresh_loop, name="wordcloud-refresh", daemon=True)
+    _refresher.start()
+
+# 마스터에서는 네트워크 요청이나 스레드를 만들지 않음 (fork 시 소켓과 락이 워커로 그대로 복사되므로)
+# 대신 spawn으로 새로 시작한 프로세스 하나가 워드클라우드 생성을 전담하고, 워커는 생성된 이미지만 제공
+def when_ready(server):
+    import wordCloud_tree
+
+    start_refresher()
+    wordCloud_tree.refresher_running = True
+
+# 워커가 종료될 때마다 (재시작 직전, 마스터에서 호출) 업데이트 프로세스가 종료되었는지 확인하고 다시 시작
+def child_exit(server, worker):
+    if _refresher is not None and not _refresher.is_alive():
+        server.log.warning("워드클라우드 업데이트 프로세스가 종료되어 다시 시작합니다 (exitcode=%s)", _refresher.exitcode)
+        start_refresher()
+
+def on_exit(server):
+    if _refresher is not None and _refresher.is_alive():
+        _refresher.terminate()
+        _refresher.join()
@@ -1,59 +1,107 @@
-from flask import Flask, send_file, jsonify
-from flask_cors import CORS
+from flask import Flask, Response, request, send_file, jsonify
+from flask_caching import Cache
 from wordcloud import WordCloud
 from collections import Counter
-from PIL import Image
+from functools import lru_cache
+from PIL import Image, ImageFont
 from dotenv import load_dotenv
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, WatchedFileHandler
+from requests.adapters import HTTPAdapter
+from io import BytesIO
 import numpy as np
+import ijson
 import re
 import random
 import requests
+import urllib3
 import os
 import html
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 
 # 로그 설정
-handler = RotatingFileHandler("server.log", maxBytes=1024 * 1024, backupCount=5)
+# gunicorn (LOG_HANDLER=watched)에서는 여러 프로세스가 같은 파일에 쓰므로, 회전은 logrotate에 맡기고 파일 교체만 감지
+if os.getenv("LOG_HANDLER") == "watched":
+    handler = WatchedFileHandler("server.log")
+else:
+    handler = RotatingFileHandler("server.log", maxBytes=1024 * 1024, backupCount=5)
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[handler, logging.StreamHandler()]
+    handlers=[handler]
 )
+log = logging.getLogger(__name__)
 
 # Flask 앱 생성 및 CORS 설정
 app = Flask(__name__)
-CORS(app)
+
+@app.after_request
+def add_cors_header(response):
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
 
 # .env 파일 로드
 load_dotenv()
 
+# 응답 캐시 설정 (기본값 SimpleCache는 프로세스별 캐시이므로, 여러 워커가 공유하려면 CACHE_TYPE=RedisCache와 CACHE_REDIS_URL 지정)
+cache = Cache(app, config={
+    "CACHE_TYPE": os.getenv("CACHE_TYPE", "SimpleCache"),
+    "CACHE_REDIS_URL": os.getenv("CACHE_REDIS_URL")
+})
+NEWS_CACHE_TIMEOUT = 300
+
 # 환경 변수에서 API 인증 정보 가져오기
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 
+# 네이버 API 요청용 세션 (커넥션 재사용으로 매 요청마다 TLS 핸드셰이크 방지)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_SESSION.headers.update({
+    "X-Naver-Client-Id": CLIENT_ID,
+    "X-Naver-Client-Secret": CLIENT_SECRET
+})
+
 # 프로젝트 디렉토리 및 리소스 경로 설정
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 FONT_PATH = os.path.join(BASE_DIR, "../font", "NotoSansKR-VariableFont_wght.ttf")
 MASK_IMAGE_PATH = os.path.join(BASE_DIR, "../image", "Recycle.png")
+WORDCLOUD_PATH = os.path.join(BASE_DIR, "wordcloud.png")
+
+# 마스크 이미지는 정적 리소스이므로 시작 시 한 번만 디코딩
+_MASK = np.array(Image.open(MASK_IMAGE_PATH))
+
+# 폰트 파일 검증 (시작 시 한 번 읽어 두어 첫 워드클라우드 생성 지연 감소)
+try:
+    ImageFont.truetype(FONT_PATH)
+except OSError as e:
+    log.error("폰트 파일을 불러올 수 없습니다: %s", e)
 
 # 워드클라우드 색상 설정
-recycle_colors = ["#008000", "#0000FF", "#FFAA00"]
+_COLORS = ("#008000", "#0000FF", "#FFAA00")
+_rand = random.Random()  # 전용 난수 생성기 (단어마다 호출되므로 random.choice 대신 사용)
 def recycle_colors_func(word, font_size, position, orientation, random_state=None, **kwargs):
-    return random.choice(recycle_colors)
+    return _COLORS[_rand.randrange(3)]
+
+# 전역 변수: 다음 업데이트 시각 (time.monotonic 기준)
+_NEXT_REFRESH = 0.0
+
+# 백그라운드 업데이트 확인 주기 (초)
+REFRESH_CHECK_INTERVAL = 600
+
+# 전역 변수: 워드클라우드 이미지 캐시 (mtime, 이미지 bytes)
+_wordcloud_cache = None
 
-# 전역 변수: 마지막 업데이트 시간
-last_updated = None  # 마지막 업데이트 시간을 저장
+# 전역 변수: 백그라운드 업데이트 실행 여부 (이 프로세스의 스레드 또는 별도 프로세스)
+refresher_running = False
+_warned_no_refresher = False
 
 # 네이버 뉴스 데이터 가져오기
 def fetch_naver_news(display=10):
     keyword = "분리수거"
     url = "https://openapi.naver.com/v1/search/news.json"
-    headers = {
-        "X-Naver-Client-Id": CLIENT_ID,
-        "X-Naver-Client-Secret": CLIENT_SECRET
-    }
     params = {
         "query": keyword,
         "display": display,
@@ -61,76 +109,159 @@ def fetch_naver_news(display=10):
         "sort": "date"
     }
     try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        logging.info(f"네이버 뉴스 API 요청 성공, 가져온 기사 개수: {len(data['items'])}")
-        return data["items"]
-    except requests.exceptions.RequestException as e:
-        logging.error(f"네이버 뉴스 API 요청 실패: {e}")
+        # 응답을 스트리밍으로 받으면서 기사 항목을 바로 파싱
+        with _SESSION.get(url, params=params, timeout=(3, 5), stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            items = list(ijson.items(response.raw, "items.item"))
+        log.info("네이버 뉴스 API 요청 성공, 가져온 기사 개수: %d", len(items))
+        return items
+    # response.raw를 직접 읽으므로 전송 중 오류는 urllib3 예외로 발생 (읽기 타임아웃, 연결 끊김, gzip 오류 등)
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, ijson.JSONError) as e:
+        log.error("네이버 뉴스 API 요청 실패: %s", e)
         return []
 
-# 텍스트 전처리 및 명사 추출
+# 기사 제목의 검색어 강조 태그 제거용 정규식
+_BTAG_RE = re.compile(r'</?b>')
+
+# 텍스트 전처리용 정규식 및 불용어
+_TOKEN_RE = re.compile(r'\b[가-힣]{2,}\b')
+_STOP = frozenset({"것", "수", "있다", "하다", "의", "를", "이", "에", "가", "은", "들", "에서"})
+
+# 텍스트 전처리 및 명사 추출 (같은 기사가 반복되므로 결과를 캐시)
+@lru_cache(maxsize=128)
 def preprocess_text(text):
-    tokens = re.findall(r'\b[가-힣]{2,}\b', text)
-    stop_words = {"것", "수", "있다", "하다", "의", "를", "이", "에", "가", "은", "들", "에서"}
-    word_freq = Counter([word for word in tokens if word not in stop_words])
+    tokens = (match.group() for match in _TOKEN_RE.finditer(text))
+    word_freq = Counter(word for word in tokens if word not in _STOP)
+    return tuple(word_freq.items())
+
+# 기사 설명 목록의 단어 빈도 계산 (중복된 설명은 한 번만 처리하고 개수만큼 곱함)
+def count_words(descriptions):
+    word_freq = Counter()
+    for description, n in Counter(descriptions).items():
+        for word, count in preprocess_text(description):
+            word_freq[word] += count * n
     return word_freq
 
+# 워드클라우드 객체 (시작 시 한 번 생성하고 매 생성 시 재사용)
+_WORDCLOUD = WordCloud(
+    font_path=FONT_PATH,
+    background_color="white",
+    mask=_MASK,
+    color_func=recycle_colors_func
+)
+
 # 워드클라우드 생성 함수
 def generate_wordcloud(word_freq, output_path):
+    # 같은 디렉토리의 임시 파일에 저장한 뒤 교체 (요청이 쓰는 중인 파일을 읽지 않도록)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
     try:
-        mask = np.array(Image.open(MASK_IMAGE_PATH))
-        wordcloud = WordCloud(
-            font_path=FONT_PATH,
-            background_color="white",
-            mask=mask,
-            color_func=recycle_colors_func
-        ).generate_from_frequencies(word_freq)
-        wordcloud.to_file(output_path)
-        logging.info("워드클라우드 이미지 생성 완료")
+        wordcloud = _WORDCLOUD.generate_from_frequencies(dict(word_freq))
+        # 압축 수준을 낮춰 PNG 인코딩 시간 단축 (전송 압축은 웹 서버/CDN이 담당)
+        wordcloud.to_image().save(tmp_path, format="PNG", optimize=False, compress_level=1)
+        os.replace(tmp_path, output_path)
+        log.info("워드클라우드 이미지 생성 완료")
     except Exception as e:
-        logging.error(f"워드클라우드 생성 실패: {e}")
+        log.error("워드클라우드 생성 실패: %s", e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 # 워드클라우드와 기사를 업데이트하는 함수
 def update_content():
-    global last_updated
-    now = datetime.now()
-
-    # 오전 6시 이후이고, 이전 업데이트가 없거나 하루가 지났다면 업데이트
-    if not last_updated or now >= last_updated + timedelta(days=1):
-        logging.info("컨텐츠 업데이트 시작")
-        descriptions = [item["description"] for item in fetch_naver_news(display=10)]
-
-        if descriptions:
-            combined_text = " ".join(descriptions)
-            word_freq = preprocess_text(combined_text)
-            generate_wordcloud(word_freq, "wordcloud.png")
-            last_updated = now.replace(hour=6, minute=0, second=0, microsecond=0)
-            logging.info(f"컨텐츠 업데이트 완료: {last_updated}")
+    global _NEXT_REFRESH
+
+    # 이전 업데이트가 없거나 다음 업데이트 시각(다음 날 오전 6시)이 지났다면 업데이트
+    if time.monotonic() >= _NEXT_REFRESH:
+        log.info("컨텐츠 업데이트 시작")
+        articles = fetch_naver_news(display=10)
+
+        if articles:
+            word_freq = count_words(item["description"] for item in articles)
+            generate_wordcloud(word_freq, WORDCLOUD_PATH)
+            now = datetime.now()
+            next_refresh = now.replace(hour=6, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            _NEXT_REFRESH = time.monotonic() + (next_refresh - now).total_seconds()
+            log.info("컨텐츠 업데이트 완료, 다음 업데이트: %s", next_refresh)
         else:
-            logging.error("네이버 뉴스 데이터를 가져오지 못했습니다.")
+            log.error("네이버 뉴스 데이터를 가져오지 못했습니다.")
 
-# 메인 페이지 라우트
-@app.route("/", methods=["GET"])
-def home():
-    return """
+# 백그라운드에서 주기적으로 컨텐츠 업데이트 (요청 처리와 렌더링 분리)
+# 시작하자마자 한 번 업데이트하고, 이후 주기마다 확인 (gunicorn.conf.py에서는 별도 프로세스로 실행)
+def refresh_loop():
+    while True:
+        try:
+            update_content()
+        except Exception as e:
+            log.error("백그라운드 업데이트 실패: %s", e)
+        time.sleep(REFRESH_CHECK_INTERVAL)
+
+# 백그라운드 업데이트 스레드는 프로세스당 한 번만 시작
+def start_background_refresh():
+    global refresher_running
+    if refresher_running:
+        return
+
+    thread = threading.Thread(target=refresh_loop, name="wordcloud-refresh", daemon=True)
+    thread.start()
+    refresher_running = True
+    log.info("백그라운드 업데이트 스레드 시작")
+
+# 워드클라우드 이미지를 메모리에 캐시 (파일 mtime이 바뀐 경우에만 다시 읽음)
+def load_wordcloud_image():
+    global _wordcloud_cache
+    mtime = os.stat(WORDCLOUD_PATH).st_mtime
+
+    if _wordcloud_cache is None or _wordcloud_cache[0] != mtime:
+        with open(WORDCLOUD_PATH, "rb") as f:
+            # stat 이후 파일이 교체되었을 수 있으므로 실제로 연 파일의 mtime 사용
+            _wordcloud_cache = (os.fstat(f.fileno()).st_mtime, f.read())
+        log.info("워드클라우드 이미지 캐시 갱신")
+    return _wordcloud_cache
+
+# 메인 페이지 HTML (고정 내용이므로 시작 시 한 번만 인코딩)
+_HOME_HTML = """
     <h1>API Server</h1>
     <p>Endpoints:</p>
     <ul>
         <li>/api/wordcloud - 워드클라우드 이미지</li>
         <li>/api/news - 뉴스 리스트</li>
     </ul>
-    """
+    """.encode("utf-8")
+
+# 메인 페이지 라우트
+@app.route("/", methods=["GET"])
+def home():
+    return Response(_HOME_HTML, mimetype="text/html")
 
 # 워드클라우드 API
 @app.route("/api/wordcloud", methods=["GET"])
 def wordcloud_endpoint():
-    update_content()  # 필요 시 컨텐츠 업데이트
-    return send_file("wordcloud.png", mimetype="image/png")
+    global _warned_no_refresher
+
+    # 렌더링은 백그라운드 업데이트가 담당하고, 여기서는 마지막 결과만 반환
+    if not refresher_running and not _warned_no_refresher:
+        log.warning("백그라운드 업데이트가 실행 중이 아니므로 워드클라우드 이미지가 갱신되지 않습니다.")
+        _warned_no_refresher = True
+    mtime, image_bytes = load_wordcloud_image()
+    return send_file(
+        BytesIO(image_bytes),
+        mimetype="image/png",
+        last_modified=mtime,
+        etag=str(mtime),
+        conditional=True
+    )
+
+# ?refresh=1 요청은 캐시를 거치지 않음
+def skip_cache():
+    return request.args.get("refresh") == "1"
+
+# 에러 응답 (tuple)은 캐시하지 않음
+def is_cacheable(rv):
+    return not isinstance(rv, tuple)
 
 # 뉴스 리스트 API
 @app.route("/api/news", methods=["GET"])
+@cache.cached(timeout=NEWS_CACHE_TIMEOUT, unless=skip_cache, response_filter=is_cacheable)
 def news_endpoint():
     articles = fetch_naver_news(display=10)  # 최대 10개의 기사 요청
 
@@ -139,11 +270,11 @@ def news_endpoint():
 
     # 중복 제거 없이 모든 기사 반환
     news_list = [{
-        "title": html.unescape(item["title"].replace("<b>", "").replace("</b>", "")),
+        "title": html.unescape(_BTAG_RE.sub("", item["title"])),
         "link": item["link"]
     } for item in articles]
 
-    logging.info(f"최종 반환된 기사 개수: {len(news_list)}")
+    log.info("최종 반환된 기사 개수: %d", len(news_list))
     return jsonify(news_list)
 
 
@@ -151,9 +282,16 @@ if __name__ == "__main__":
     import sys
     import os
 
+    # 개발 서버로 직접 실행할 때만 콘솔에도 로그 출력
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(handler.formatter)
+    logging.getLogger().addHandler(console_handler)
+
     # 서버 중복 실행 방지
     try:
-        update_content()  # 서버 시작 시 즉시 업데이트
+        # debug 모드의 리로더는 부모/자식 프로세스 모두 이 블록을 실행하므로, 실제 서버인 자식에서만 업데이트
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            start_background_refresh()  # 서버 시작 시 즉시 업데이트
         app.run(debug=True, host="0.0.0.0", port=5001)
     except OSError as e:
         if "Address already in use" in str(e):